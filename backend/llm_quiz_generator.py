@@ -1,9 +1,15 @@
-import os
+import asyncio
+import contextlib
+import functools
+import itertools
 import json
+import os
 import random
-from typing import List, Dict, Optional
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 
-from pydantic import BaseModel, ValidationError
+import msgspec
+from aiolimiter import AsyncLimiter
 
 
 # Prompt templates used when calling an LLM (kept here for transparency and tuning)
@@ -31,7 +37,7 @@ Output JSON only, no extra commentary.
 """
 
 
-class QuestionModel(BaseModel):
+class QuestionModel(msgspec.Struct):
     question: str
     options: List[str]
     answer: str
@@ -39,34 +45,44 @@ class QuestionModel(BaseModel):
     difficulty: str
 
 
-class QuizModel(BaseModel):
-    title: Optional[str]
-    summary: Optional[str]
+class QuizModel(msgspec.Struct, kw_only=True):
+    title: Optional[str] = None
+    summary: Optional[str] = None
     quiz: List[QuestionModel]
     related_topics: List[str]
 
 
+# Runs of text between sentence terminators
+_SENTENCE_RE = re.compile(r"[^.!?]+")
+_MAX_SENTENCES = 64
+# Words of 4+ letters (any script, no digits): the pool of distractor options
+_WORD_RE = re.compile(r"[^\W\d_]{4,}")
+# Letter runs of any script, hyphenated compounds kept whole; title-case ones of 4+ characters are the
+# answer candidates for a fallback question
+_TITLE_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+_DIFFICULTIES = ("easy", "medium", "hard")
+_DIFFICULTY_WEIGHTS = (3, 2, 1)
+
+
 def _fallback_generate_from_text(title: str, summary: str, clean_text: str, sections: List[str]) -> Dict:
     """A simple deterministic fallback quiz generator for testing when no LLM key is provided.
 
     It creates questions by selecting statements from the first few sentences and making multiple choice options by
     mixing keywords. This is NOT as good as an LLM but useful for offline testing.
     """
-    sentences = [s.strip() for s in clean_text.split('.') if s.strip()]
+    # Only the first few sentences are ever used, so stop scanning the article once enough are found
+    stripped = (m.group().strip() for m in _SENTENCE_RE.finditer(clean_text))
+    sentences = list(itertools.islice(filter(None, stripped), _MAX_SENTENCES))
     if not sentences:
         sentences = [summary] if summary else [title]
 
     num_q = min(7, max(5, len(sentences) // 3))
     quiz = []
+    rng = random.Random()
 
     # Build a simple pool of candidate words for fake options
-    words = set()
-    for s in sentences[:20]:
-        for w in s.split():
-            w = w.strip(',.()"').capitalize()
-            if len(w) > 3 and not w.isnumeric():
-                words.add(w)
-    words = list(words)[:50]
+    words = list(dict.fromkeys(w.capitalize() for w in _WORD_RE.findall(" ".join(sentences[:20]))))[:50]
 
     for i in range(num_q):
         idx = i if i < len(sentences) else 0
@@ -74,23 +90,21 @@ def _fallback_generate_from_text(title: str, summary: str, clean_text: str, sect
         if len(q_text) < 10:
             q_text = (summary or title)[:200]
 
-        tokens = [t.strip(',.()"') for t in sentences[idx].split()]
-        candidates = [t for t in tokens if t.istitle() and len(t) > 3]
+        candidates = [w for w in _TITLE_WORD_RE.findall(sentences[idx]) if len(w) > 3 and w.istitle()]
         if candidates:
-            correct = random.choice(candidates)
+            correct = rng.choice(candidates)
         else:
             parts = sentences[idx].split()
             correct = parts[0] if parts else title
 
         # build options
-        options = [correct]
+        pool = [w for w in words if w != correct]
+        options = [correct] + rng.sample(pool, k=min(3, len(pool)))
         while len(options) < 4:
-            pick = random.choice(words) if words else f"Option{random.randint(1,99)}"
-            if pick not in options:
-                options.append(pick)
-        random.shuffle(options)
+            options.append(f"Option{len(options)}")
+        rng.shuffle(options)
 
-        difficulty = random.choice(["easy"] * 3 + ["medium"] * 2 + ["hard"])
+        difficulty = rng.choices(_DIFFICULTIES, weights=_DIFFICULTY_WEIGHTS, k=1)[0]
         explanation = f"Based on the article text: '{sentences[idx][:120].strip()}'."
 
         q = {
@@ -119,91 +133,195 @@ def _fallback_generate_from_text(title: str, summary: str, clean_text: str, sect
     }
 
 
-def _call_gemini(prompt: str) -> Optional[str]:
-    """Attempt to call Google Gemini via the google.generativeai client if available.
+# SDK clients are built on first use and shared across requests
+@functools.lru_cache(maxsize=1)
+def _gemini_model():
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    # model choice can be configured; use a conservative default
+    return genai.GenerativeModel(os.getenv("GEMINI_MODEL", "gemini-pro"))
+
+
+@functools.lru_cache(maxsize=1)
+def _openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+
 
-    Returns the raw text output or None on failure.
-    Requirements: pip install google-generative-ai and set environment variable GEMINI_API_KEY.
+# Bounds on outgoing LLM traffic: in-flight requests, and requests started per minute (provider QPM quota)
+_LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "10")))
+_LLM_LIMITER = AsyncLimiter(max_rate=int(os.getenv("LLM_MAX_RPM", "500")), time_period=60)
+_LLM_MAX_RETRIES = 3
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    # openai.RateLimitError exposes status_code, google.api_core's ResourceExhausted exposes code
+    return getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429
+
+
+@contextlib.asynccontextmanager
+async def _llm_request(start: Callable[[], Awaitable]):
+    """Open an LLM request under the QPM limiter and concurrency semaphore, retrying 429s with backoff and jitter.
+
+    The semaphore slot is held while the caller consumes the response, but released during backoff sleeps so
+    rate-limited requests do not block others from running.
     """
-    try:
-        import google.generativeai as genai
-        key = os.getenv("GEMINI_API_KEY")
-        if not key:
-            return None
-        genai.configure(api_key=key)
-        # model choice can be configured; use a conservative default
-        model = os.getenv("GEMINI_MODEL", "models/text-bison-001")
-        resp = genai.generate(model=model, prompt=prompt, max_output_tokens=800)
-        # Attempt to extract text
-        text = None
-        if hasattr(resp, "text"):
-            text = resp.text
-        else:
-            # some clients return a nested structure
-            text = str(resp)
-        return text
-    except Exception:
-        return None
+    for attempt in range(_LLM_MAX_RETRIES + 1):
+        await _LLM_LIMITER.acquire()
+        async with _LLM_SEM:
+            try:
+                resp = await start()
+            except Exception as exc:
+                if attempt == _LLM_MAX_RETRIES or not _is_rate_limited(exc):
+                    raise
+            else:
+                yield resp
+                return
+        await asyncio.sleep(random.uniform(0, 2 ** attempt))
+
+
+async def _call_gemini(prompt: str) -> AsyncIterator[str]:
+    """Stream text chunks from Google Gemini via the google.generativeai async API.
+
+    Only called when GEMINI_API_KEY is set. Raises on failure; callers decide whether to fall back.
+    Requirements: pip install google-generativeai and set environment variable GEMINI_API_KEY.
+    """
+    model = _gemini_model()
+    async with _llm_request(
+        lambda: model.generate_content_async(prompt, generation_config={"max_output_tokens": 800}, stream=True)
+    ) as resp:
+        async for chunk in resp:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
 
 
-def _call_openai(prompt: str) -> Optional[str]:
-    """Call OpenAI Chat Completions directly if `openai` is installed and OPENAI_API_KEY is set.
+async def _call_openai(prompt: str) -> AsyncIterator[str]:
+    """Stream assistant text chunks from OpenAI Chat Completions via AsyncOpenAI.
 
-    Returns the assistant text or None on failure.
+    Only called when OPENAI_API_KEY is set. Raises on failure; callers decide whether to fall back.
     """
-    try:
-        import openai
-        key = os.getenv("OPENAI_API_KEY")
-        if not key:
-            return None
-        openai.api_key = key
-        model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        resp = openai.ChatCompletion.create(model=model, messages=[{"role": "user", "content": prompt}], temperature=0.2, max_tokens=800)
-        if resp and resp.choices:
-            return resp.choices[0].message.get('content')
-        return None
-    except Exception:
-        return None
+    client = _openai_client()
+    model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    async with _llm_request(
+        lambda: client.chat.completions.create(model=model, messages=[{"role": "user", "content": prompt}], temperature=0.2, max_tokens=800, stream=True)
+    ) as stream:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
 
 def _parse_and_validate_json(text: str) -> Optional[Dict]:
-    """Attempt to load JSON from text and validate with Pydantic schema."""
+    """Decode JSON from text and validate it against the quiz schema in a single msgspec pass."""
     try:
-        payload = json.loads(text)
-        # validate shape
-        validated = QuizModel.parse_obj(payload)
-        return validated.dict()
-    except (json.JSONDecodeError, ValidationError):
+        validated = msgspec.json.decode(text, type=QuizModel)
+    except (msgspec.DecodeError, msgspec.ValidationError):
         return None
+    return msgspec.to_builtins(validated)
 
 
-def generate_quiz(title: str, summary: str, clean_text: str, sections: List[str]) -> Dict:
-    """Top-level function to generate a quiz. Prefers Gemini, then OpenAI, falls back to deterministic generator.
+_QUIZ_ARRAY_RE = re.compile(r'"quiz"\s*:\s*\[')
+_ARRAY_SEP_RE = re.compile(r"[\s,]*")
 
-    This function will attempt to call an LLM if the appropriate env var and client library are available.
-    If calls fail, it returns the deterministic fallback output so the app remains functional offline.
+
+class _QuestionStreamParser:
+    """Incrementally extracts complete question objects from a streamed quiz JSON document.
+
+    Only the "quiz" array is inspected; each element is emitted once its closing brace has arrived
+    and it validates against QuestionModel.
     """
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    openai_key = os.getenv("OPENAI_API_KEY")
 
+    _decoder = json.JSONDecoder()
+
+    def __init__(self):
+        self._buf = ""
+        self._pos: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self._buf += chunk
+        out = []
+        if self._done:
+            return out
+        if self._pos is None:
+            m = _QUIZ_ARRAY_RE.search(self._buf)
+            if not m:
+                return out
+            self._pos = m.end()
+        while True:
+            pos = _ARRAY_SEP_RE.match(self._buf, self._pos).end()
+            if pos >= len(self._buf):
+                break
+            if self._buf[pos] == "]":
+                self._done = True
+                break
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, pos)
+            except json.JSONDecodeError:
+                # element not complete yet
+                break
+            self._pos = end
+            try:
+                out.append(msgspec.to_builtins(msgspec.convert(obj, QuestionModel)))
+            except msgspec.ValidationError:
+                continue
+        return out
+
+
+async def stream_quiz(title: str, summary: str, clean_text: str, sections: List[str]) -> AsyncIterator[Tuple[str, Dict]]:
+    """Streaming form of generate_quiz.
+
+    Yields ("question", question) as each question becomes available, then one final event carrying the
+    complete payload: ("result", quiz) for an LLM-validated quiz, or for the fallback when no provider key is
+    configured; ("degraded", quiz) when a configured provider failed and the quiz is partial or the fallback.
+    Only "result" payloads are worth caching, since a degraded one may succeed on retry.
+    Providers are tried in the same order as generate_quiz; a provider that fails before producing any
+    question is skipped, and the deterministic fallback is used when none succeeds.
+    """
     prompt = QUIZ_PROMPT_TEMPLATE + "\n\nARTICLE_TITLE:\n" + (title or "") + "\n\nARTICLE_TEXT:\n" + (clean_text or summary or "")
 
-    # Try Gemini first
-    if gemini_key:
-        text = _call_gemini(prompt)
-        if text:
-            parsed = _parse_and_validate_json(text)
-            if parsed:
-                return parsed
-
-    # Try OpenAI next
-    if openai_key:
-        text = _call_openai(prompt)
-        if text:
-            parsed = _parse_and_validate_json(text)
-            if parsed:
-                return parsed
+    providers = []
+    if os.getenv("GEMINI_API_KEY"):
+        providers.append(_call_gemini)
+    if os.getenv("OPENAI_API_KEY"):
+        providers.append(_call_openai)
+
+    for call in providers:
+        parser = _QuestionStreamParser()
+        chunks = []
+        emitted = []
+        try:
+            async for chunk in call(prompt):
+                chunks.append(chunk)
+                for q in parser.feed(chunk):
+                    emitted.append(q)
+                    yield "question", q
+        except Exception:
+            pass
+
+        parsed = _parse_and_validate_json("".join(chunks)) if chunks else None
+        if parsed:
+            yield "result", parsed
+            return
+        if emitted:
+            # Questions already went out; finish with them rather than mixing in another provider
+            yield "degraded", {"title": title, "summary": summary, "quiz": emitted, "related_topics": []}
+            return
 
     # Fallback deterministic generator
-    return _fallback_generate_from_text(title, summary, clean_text, sections)
+    result = _fallback_generate_from_text(title, summary, clean_text, sections)
+    for q in result["quiz"]:
+        yield "question", q
+    yield ("degraded" if providers else "result"), result
+
+
+async def generate_quiz(title: str, summary: str, clean_text: str, sections: List[str]) -> Tuple[Dict, bool]:
+    """Top-level function to generate a quiz. Prefers Gemini, then OpenAI, falls back to deterministic generator.
 
+    This function will attempt to call an LLM if the appropriate env var and client library are available.
+    If calls fail, it returns the deterministic fallback output so the app remains functional offline.
+    Returns (quiz, cacheable); cacheable is False when the quiz is degraded by a provider failure (see stream_quiz).
+    """
+    async for kind, payload in stream_quiz(title, summary, clean_text, sections):
+        if kind != "question":
+            return payload, kind == "result"
@@ -1,22 +1,26 @@
+import logging
 import os
-import json
-from fastapi import FastAPI, HTTPException, Request
+
+import orjson
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import ORJSONResponse, HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from .database import SessionLocal, init_db
 from . import models
-from .scraper import scrape_wikipedia, is_wikipedia_url
-from .llm_quiz_generator import generate_quiz
+from .scraper import close_client, scrape_wikipedia, is_wikipedia_url
+from .llm_quiz_generator import generate_quiz, stream_quiz
+from . import quiz_cache
 
 import pathlib
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
 
-app = FastAPI(title="AI Wiki Quiz Generator")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="AI Wiki Quiz Generator", default_response_class=ORJSONResponse)
 
 origins = [os.getenv("FRONTEND_ORIGIN", "http://localhost:8000")]
 app.add_middleware(
@@ -36,38 +40,53 @@ def get_db():
         db.close()
 
 
-class URLInput(BaseModel):
-    url: str
-
-
 @app.on_event("startup")
 def startup_event():
     init_db()
 
 
-@app.post("/generate_quiz")
-async def generate_quiz_endpoint(payload: URLInput):
-    url = payload.url.strip()
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_client()
+
+
+def _persist_quiz(url: str, full: dict) -> None:
+    """Store a generated quiz; runs as a background task after the response has been sent."""
+    with SessionLocal() as db:
+        q = models.Quiz(
+            url=url,
+            title=full["title"],
+            full_quiz_data=orjson.dumps(full).decode(),
+        )
+        db.add(q)
+        db.commit()
+
+
+async def _read_url(request: Request) -> str:
+    # The body is a single {"url": "..."} field; decode it directly rather than through a Pydantic model
+    try:
+        body = orjson.loads(await request.body())
+        url = body["url"].strip()
+    except (orjson.JSONDecodeError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=422, detail="Request body must be JSON with a string 'url' field")
     if not is_wikipedia_url(url):
         raise HTTPException(status_code=400, detail="Provided URL is not a Wikipedia URL")
+    return url
+
 
+async def _scrape_or_400(url: str) -> dict:
     try:
-        scraped = scrape_wikipedia(url)
+        return await scrape_wikipedia(url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error scraping URL: {e}")
 
-    # Generate quiz using LLM or fallback
-    result = generate_quiz(
-        scraped.get("title", ""),
-        scraped.get("summary", ""),
-        scraped.get("clean_text", ""),
-        scraped.get("sections", []),
-    )
 
-    print("✅ QUIZ GENERATED:", json.dumps(result, indent=2)[:500])  # debug line
+def _build_full(url: str, scraped: dict, result: dict) -> dict:
+    """Build full payload to store and return."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Quiz generated: %s", orjson.dumps(result, option=orjson.OPT_INDENT_2)[:500].decode(errors="ignore"))
 
-    # Build full payload to store
-    full = {
+    return {
         "url": url,
         "title": result.get("title") or scraped.get("title"),
         "summary": result.get("summary") or scraped.get("summary"),
@@ -75,67 +94,100 @@ async def generate_quiz_endpoint(payload: URLInput):
         "sections": scraped.get("sections", []),
         "quiz": result.get("quiz"),
         "related_topics": result.get("related_topics", []),
-        "scraped_raw_html": scraped.get("raw_html"),
     }
 
-    # Save to DB
-    db: Session = next(get_db())
-    q = models.Quiz(
-        url=url,
-        title=full["title"],
-        scraped_content=full.get("scraped_raw_html"),
-        full_quiz_data=json.dumps(full, ensure_ascii=False),
-    )
-    db.add(q)
-    db.commit()
-    db.refresh(q)
-
-    out = {"id": q.id, **full}
-    return JSONResponse(content=out)
-
-
-    # Generate quiz using LLM or fallback
-    result = generate_quiz(
-    scraped.get("title", ""),
-    scraped.get("summary", ""),
-    scraped.get("clean_text", ""),
-    scraped.get("sections", []),
-)
-
-    print("✅ QUIZ GENERATED:", json.dumps(result, indent=2)[:500])  # debug print
-
-
-    # Build full payload to store
-    full = {
-        "url": url,
-        "title": result.get("title") or scraped.get("title"),
-        "summary": result.get("summary") or scraped.get("summary"),
-        "key_entities": {},
-        "sections": scraped.get("sections", []),
-        "quiz": result.get("quiz"),
-        "related_topics": result.get("related_topics", []),
-        "scraped_raw_html": scraped.get("raw_html"),
-    }
-
-    # Save to DB
-    db: Session = next(get_db())
-    q = models.Quiz(
-        url=url,
-        title=full["title"],
-        scraped_content=full.get("scraped_raw_html"),
-        full_quiz_data=json.dumps(full, ensure_ascii=False),
-    )
-    db.add(q)
-    db.commit()
-    db.refresh(q)
-
-    out = {"id": q.id, **full}
-    return JSONResponse(content=out)
-
 
+@app.post("/generate_quiz")
+async def generate_quiz_endpoint(request: Request, background_tasks: BackgroundTasks):
+    url = await _read_url(request)
+
+    # Exact hit: the same article was already scraped and quizzed. Still record the generation in history.
+    cached = quiz_cache.get_by_url(url)
+    if cached is not None:
+        background_tasks.add_task(_persist_quiz, url, cached)
+        return ORJSONResponse(content=cached)
+
+    scraped = await _scrape_or_400(url)
+
+    # Generate quiz using LLM or fallback, reusing any quiz built from identical article text
+    result = quiz_cache.get_by_content(scraped.get("clean_text", ""))
+    cacheable = True
+    if result is None:
+        result, cacheable = await generate_quiz(
+            scraped.get("title", ""),
+            scraped.get("summary", ""),
+            scraped.get("clean_text", ""),
+            scraped.get("sections", []),
+        )
+        # Degraded quizzes (LLM failure) are not cached so the next request retries the LLM
+        if cacheable:
+            quiz_cache.set_by_content(scraped.get("clean_text", ""), result)
+
+    full = _build_full(url, scraped, result)
+
+    # Save to DB off the request path; the quiz is returned without waiting for the commit
+    background_tasks.add_task(_persist_quiz, url, full)
+
+    if cacheable:
+        quiz_cache.set_by_url(url, full)
+    return ORJSONResponse(content=full)
+
+
+def _ndjson(kind: str, data) -> bytes:
+    return orjson.dumps({"type": kind, "data": data}) + b"\n"
+
+
+@app.post("/generate_quiz/stream")
+async def generate_quiz_stream_endpoint(request: Request, background_tasks: BackgroundTasks):
+    """Same as /generate_quiz, but streams NDJSON: one {"type": "question"} line per question as the LLM
+    produces it, then a final {"type": "quiz"} line carrying the full payload."""
+    url = await _read_url(request)
+
+    cached = quiz_cache.get_by_url(url)
+    scraped = None if cached is not None else await _scrape_or_400(url)
+
+    async def events():
+        if cached is not None:
+            for q in cached.get("quiz") or []:
+                yield _ndjson("question", q)
+            background_tasks.add_task(_persist_quiz, url, cached)
+            yield _ndjson("quiz", cached)
+            return
+
+        clean_text = scraped.get("clean_text", "")
+        result = quiz_cache.get_by_content(clean_text)
+        cacheable = True
+        if result is not None:
+            for q in result.get("quiz") or []:
+                yield _ndjson("question", q)
+        else:
+            async for kind, payload in stream_quiz(
+                scraped.get("title", ""),
+                scraped.get("summary", ""),
+                clean_text,
+                scraped.get("sections", []),
+            ):
+                if kind == "question":
+                    yield _ndjson("question", payload)
+                else:
+                    result, cacheable = payload, kind == "result"
+            if cacheable:
+                quiz_cache.set_by_content(clean_text, result)
+
+        full = _build_full(url, scraped, result)
+        if cacheable:
+            quiz_cache.set_by_url(url, full)
+        # Queued before the last line goes out; it runs once the response is complete, even if the client
+        # disconnects right after receiving the quiz
+        background_tasks.add_task(_persist_quiz, url, full)
+        yield _ndjson("quiz", full)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=background_tasks)
+
+
+# Plain def endpoints: the SQLAlchemy session is synchronous, so FastAPI runs them in its threadpool
 @app.get("/history")
-async def history():
-    db: Session = next(get_db())
+def history(db: Session = Depends(get_db)):
     rows = db.query(models.Quiz).order_by(models.Quiz.date_generated.desc()).all()
     out = []
     for r in rows:
@@ -145,20 +197,21 @@ async def history():
             "title": r.title,
             "date_generated": r.date_generated.isoformat(),
         })
-    return JSONResponse(content=out)
+    return ORJSONResponse(content=out)
 
 
 @app.get("/quiz/{quiz_id}")
-async def get_quiz(quiz_id: int):
-    db: Session = next(get_db())
+def get_quiz(quiz_id: int, db: Session = Depends(get_db)):
     r = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
     if not r:
         raise HTTPException(status_code=404, detail="Quiz not found")
     try:
-        data = json.loads(r.full_quiz_data)
+        data = orjson.loads(r.full_quiz_data)
+        # Rows saved before raw HTML was dropped still carry it; never send it to clients
+        data.pop("scraped_raw_html", None)
     except Exception:
         data = {"error": "failed to parse stored quiz data"}
-    return JSONResponse(content={"id": r.id, "url": r.url, "title": r.title, "date_generated": r.date_generated.isoformat(), **data})
+    return ORJSONResponse(content={"id": r.id, "url": r.url, "title": r.title, "date_generated": r.date_generated.isoformat(), **data})
 
 
 # Serve frontend static files
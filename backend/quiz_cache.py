@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class _LRUCache:
+    """Small in-process LRU mapping of string keys to quiz payloads, with optional per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Optional[float], Dict]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "256"))
+_URL_CACHE_TTL = float(os.getenv("QUIZ_CACHE_TTL", "86400"))
+
+# Tier 1: normalized article URL -> full endpoint response; expires so edited articles are fetched again
+_url_cache = _LRUCache(_CACHE_SIZE, ttl=_URL_CACHE_TTL)
+# Tier 2: hash of the cleaned article text -> generated quiz (the key changes whenever the text does)
+_content_cache = _LRUCache(_CACHE_SIZE)
+
+
+# Query parameters that select a specific revision or page id rather than the current article
+_UNCACHEABLE_PARAMS = ("oldid", "diff", "curid")
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """Canonical form of a Wikipedia URL so trivially different links share a cache entry.
+
+    /w/index.php?title=X links map to the same key as /wiki/X. Returns None for links that pin a revision
+    (oldid, diff) or a page id (curid); those are never cached.
+    """
+    p = urlparse(url.strip())
+    query = parse_qs(p.query)
+    if any(name in query for name in _UNCACHEABLE_PARAMS):
+        return None
+    host = p.netloc.lower().replace(".m.wikipedia.org", ".wikipedia.org")
+    path = unquote(p.path).rstrip("/")
+    if "title" in query and path.endswith("/index.php"):
+        path = "/wiki/" + query["title"][0]
+    return f"https://{host}{path.replace(' ', '_')}"
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_by_url(url: str) -> Optional[Dict]:
+    key = normalize_url(url)
+    if key is None:
+        return None
+    return _url_cache.get(_hash(key))
+
+
+def set_by_url(url: str, payload: Dict) -> None:
+    key = normalize_url(url)
+    if key is not None:
+        _url_cache.set(_hash(key), payload)
+
+
+def get_by_content(clean_text: str) -> Optional[Dict]:
+    """Looks up a quiz generated for identical article text (e.g. reached through a redirect)."""
+    if not clean_text:
+        return None
+    return _content_cache.get(_hash(clean_text))
+
+
+def set_by_content(clean_text: str, quiz: Dict) -> None:
+    if clean_text:
+        _content_cache.set(_hash(clean_text), quiz)
@@ -1,6 +1,40 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+import asyncio
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+import hishel
+import httpx
+from lxml import html as lxml_html
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+# Shared async client so scraping never blocks the event loop. Connections to Wikipedia are kept
+# alive in a bounded pool (and multiplexed over HTTP/2), so warm requests skip the TCP/TLS handshake.
+# Responses go through an on-disk HTTP cache that honours Cache-Control. The Action API answers
+# "max-age=0" by default, so _fetch_from_api asks it for a max-age matching the cache TTL.
+_CACHE_TTL = int(os.getenv("WIKI_CACHE_TTL", "86400"))
+_CLIENT = httpx.AsyncClient(
+    transport=hishel.AsyncCacheTransport(
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=3,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        ),
+        storage=hishel.AsyncFileStorage(
+            base_path=Path(os.getenv("WIKI_CACHE_DIR", ".wiki_cache")),
+            ttl=_CACHE_TTL,
+        ),
+    ),
+    headers={"User-Agent": "ai-quiz-generator/1.0"},
+    timeout=httpx.Timeout(15.0),
+    follow_redirects=True,
+)
+
+
+async def close_client() -> None:
+    await _CLIENT.aclose()
 
 
 def is_wikipedia_url(url: str) -> bool:
@@ -11,43 +45,32 @@ def is_wikipedia_url(url: str) -> bool:
         return False
 
 
-def scrape_wikipedia(url: str) -> dict:
-    """Fetches the Wikipedia page and extracts title, summary, sections and cleaned text.
-
-    Returns a dict: { title, summary, sections (list), clean_text }
-    """
-    if not is_wikipedia_url(url):
-        raise ValueError("URL is not a Wikipedia URL")
+_HEADLINE_XPATH = './/*[self::h2 or self::h3]/span[contains(concat(" ", normalize-space(@class), " "), " mw-headline ")]'
 
-    resp = requests.get(url, headers={"User-Agent": "ai-quiz-generator/1.0"}, timeout=15)
-    resp.raise_for_status()
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+def _parse_html(content: bytes) -> dict:
+    """Extracts title, summary, sections and cleaned text from a Wikipedia HTML page."""
+    tree = lxml_html.fromstring(content)
 
     # Title
-    title_tag = soup.find(id="firstHeading")
-    title = title_tag.get_text(strip=True) if title_tag else soup.title.string if soup.title else ""
+    title_nodes = tree.xpath('//*[@id="firstHeading"]') or tree.xpath("//title")
+    title = title_nodes[0].text_content().strip() if title_nodes else ""
 
     # Main content
-    content_div = soup.find(id="mw-content-text") or soup.find("body")
+    content_nodes = tree.xpath('//*[@id="mw-content-text"]') or tree.xpath("//body")
+    content_div = content_nodes[0] if content_nodes else tree
 
-    # Remove references, sup tags, and tables
-    for sup in content_div.find_all("sup"):
-        sup.decompose()
-    for table in content_div.find_all("table"):
-        table.decompose()
+    # Remove references, sup tags, and tables (drop_tree keeps the text that follows each element)
+    for el in content_div.xpath(".//sup | .//table"):
+        el.drop_tree()
 
     # Sections: headings inside content
-    sections = []
-    for header in content_div.find_all(["h2", "h3"]):
-        span = header.find("span", class_="mw-headline")
-        if span:
-            sections.append(span.get_text(strip=True))
+    sections = [span.text_content().strip() for span in content_div.xpath(_HEADLINE_XPATH)]
 
     # Extract paragraphs
     paragraphs = []
-    for p in content_div.find_all("p"):
-        text = p.get_text(strip=True)
+    for p in content_div.xpath(".//p"):
+        text = "".join(p.itertext()).strip()
         if text:
             paragraphs.append(text)
 
@@ -59,5 +82,98 @@ def scrape_wikipedia(url: str) -> dict:
         "summary": summary,
         "sections": sections,
         "clean_text": clean_text,
-        "raw_html": resp.text,
     }
+
+
+_HEADING_RE = re.compile(r"^(={2,})\s*(.*?)\s*\1$")
+
+
+def _parse_extract(title: str, extract: str) -> dict:
+    """Splits a plain-text extract (wiki-style "== Heading ==" lines) into sections and paragraphs."""
+    sections = []
+    paragraphs = []
+    for line in extract.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        m = _HEADING_RE.match(line)
+        if m:
+            # Mirror the HTML path, which collects h2 and h3 headings
+            if len(m.group(1)) <= 3 and m.group(2):
+                sections.append(m.group(2))
+            continue
+        paragraphs.append(line)
+
+    return {
+        "title": title,
+        "summary": paragraphs[0] if paragraphs else "",
+        "sections": sections,
+        "clean_text": "\n\n".join(paragraphs),
+    }
+
+
+async def _fetch_from_api(url: str) -> Optional[dict]:
+    """Fetches the article as plain text through the MediaWiki Action API.
+
+    Returns None when the URL is not a /wiki/<title> or index.php?title= link, pins a revision, or the page is
+    unknown to the API, so the caller can fall back to scraping the HTML page.
+    """
+    p = urlparse(url)
+    query = parse_qs(p.query)
+    # The API returns the current article text, so links to a specific revision or diff use the HTML path
+    if "oldid" in query or "diff" in query:
+        return None
+    if p.path.startswith("/wiki/"):
+        page = unquote(p.path[len("/wiki/"):])
+    elif p.path.endswith("/index.php") and "title" in query:
+        page = query["title"][0]
+    else:
+        return None
+    if not page:
+        return None
+
+    host = p.netloc.lower().replace(".m.wikipedia.org", ".wikipedia.org")
+    resp = await _CLIENT.get(
+        f"https://{host}/w/api.php",
+        params={
+            "action": "query",
+            "prop": "extracts",
+            "explaintext": 1,
+            "exsectionformat": "wiki",
+            "redirects": 1,
+            "titles": page,
+            "format": "json",
+            "formatversion": 2,
+            # Make the response cacheable (Cache-Control: public, max-age) so hishel serves repeats from disk
+            "maxage": _CACHE_TTL,
+            "smaxage": _CACHE_TTL,
+        },
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+
+    pages = resp.json().get("query", {}).get("pages", [])
+    if not pages or pages[0].get("missing") or not pages[0].get("extract"):
+        return None
+    return _parse_extract(pages[0].get("title", page), pages[0]["extract"])
+
+
+async def scrape_wikipedia(url: str) -> dict:
+    """Fetches the Wikipedia page and extracts title, summary, sections and cleaned text.
+
+    Returns a dict: { title, summary, sections (list), clean_text }
+    """
+    if not is_wikipedia_url(url):
+        raise ValueError("URL is not a Wikipedia URL")
+
+    # Prefer the API: plain text is a fraction of the page size and needs no HTML parsing
+    parsed = await _fetch_from_api(url)
+    if parsed is not None:
+        return parsed
+
+    resp = await _CLIENT.get(url)
+    resp.raise_for_status()
+
+    # HTML parsing is CPU-bound; run it in a worker thread to keep the loop free
+    return await asyncio.to_thread(_parse_html, resp.content)
@@ -0,0 +1,23 @@
+from backend import quiz_cache
+
+
+def test_index_php_title_links_do_not_share_a_key():
+    python = quiz_cache.normalize_url("https://en.wikipedia.org/w/index.php?title=Python")
+    java = quiz_cache.normalize_url("https://en.wikipedia.org/w/index.php?title=Java")
+    assert python != java
+    assert python == quiz_cache.normalize_url("https://en.wikipedia.org/wiki/Python")
+
+
+def test_revision_links_are_not_cached():
+    quiz_cache.set_by_url("https://en.wikipedia.org/wiki/Python", {"title": "Python"})
+    url = "https://en.wikipedia.org/wiki/Python?oldid=123"
+    assert quiz_cache.normalize_url(url) is None
+    assert quiz_cache.get_by_url(url) is None
+    quiz_cache.set_by_url(url, {"title": "old Python"})
+    assert quiz_cache.get_by_url("https://en.wikipedia.org/wiki/Python") == {"title": "Python"}
+
+
+def test_cached_quiz_is_only_returned_for_its_own_article():
+    quiz_cache.set_by_url("https://en.wikipedia.org/w/index.php?title=Python", {"title": "Python"})
+    assert quiz_cache.get_by_url("https://en.wikipedia.org/w/index.php?title=Java") is None
+    assert quiz_cache.get_by_url("https://en.m.wikipedia.org/wiki/Python/") == {"title": "Python"}